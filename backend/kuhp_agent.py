@@ -5,28 +5,159 @@ Menggunakan Gemini File API untuk analisis PDF langsung
 
 import os
 import time
+import logging
+import random
+import asyncio
+import hashlib
 import json
 import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional, Tuple
 from dataclasses import dataclass
 
+log = logging.getLogger("kuhp")
+
 # Google AI SDK for File API
 try:
     import google.generativeai as genai
     GENAI_AVAILABLE = True
 except ImportError:
-    print("[ERROR] Google AI SDK not available")
+    log.error("Google AI SDK not available")
     GENAI_AVAILABLE = False
 
+# Aho-Corasick untuk keyword matching (opsional, fallback ke regex)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+KUHP_KEYWORDS = (
+    'kuhp', 'hukum pidana', 'pasal', 'pidana', 'kejahatan', 'pelanggaran',
+    'pencurian', 'pembunuhan', 'penganiayaan', 'penipuan', 'korupsi',
+    'perkosaan', 'narkoba', 'terorisme', 'cyber', 'cyber crime',
+    'sanksi', 'hukuman', 'denda', 'penjara', 'kurungan', 'tahanan',
+    'tindak pidana', 'delik', 'unsur', 'ancaman', 'maksimal', 'minimal'
+)
+
+# Thread pool untuk probe get_file yang berjalan paralel
+_PROBE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kuhp-probe")
+
+# Fast path: keyword satu kata dicek lewat set membership per token query
+_KW_SINGLE = frozenset(k for k in KUHP_KEYWORDS if " " not in k)
+
+# Dibangun sekali saat import, bukan setiap kali query dicek
+if AHOCORASICK_AVAILABLE:
+    _KUHP_AUTOMATON = ahocorasick.Automaton()
+    for _keyword in KUHP_KEYWORDS:
+        _KUHP_AUTOMATON.add_word(_keyword, _keyword)
+    _KUHP_AUTOMATON.make_automaton()
+else:
+    _KUHP_PATTERN = re.compile("|".join(map(re.escape, KUHP_KEYWORDS)))
+
+
+# Prompt statis, disiapkan sekali saat import
+_IRRELEVANT_RESPONSE = """Maaf, pertanyaan Anda sepertinya tidak terkait dengan KUHP (Kitab Undang-Undang Hukum Pidana) Indonesia.
+
+Saya adalah AI assistant yang khusus dirancang untuk menganalisis perbedaan antara KUHP lama dan KUHP baru yang berlaku di Indonesia.
+
+Silakan tanyakan hal-hal yang berkaitan dengan:
+• Pasal-pasal dalam KUHP
+• Jenis-jenis tindak pidana (kejahatan dan pelanggaran)
+• Sanksi dan hukuman dalam KUHP
+• Perbedaan ketentuan antara KUHP lama dan baru
+• Perubahan sistem pemidanaan
+
+Contoh pertanyaan yang dapat saya bantu:
+- "Apa perbedaan Pasal 351 tentang penganiayaan di KUHP lama dan baru?"
+- "Bagaimana perubahan ketentuan tentang pencurian?"
+- "Apa sanksi untuk tindak pidana korupsi di KUHP baru?"
+"""
+
+_ANALYSIS_PROMPT_TEMPLATE = """Anda adalah AI assistant yang ahli dalam menganalisis KUHP (Kitab Undang-Undang Hukum Pidana) Indonesia.
+
+Tugas Anda: Analisis perbedaan antara KUHP lama dan KUHP baru berdasarkan query pengguna dengan menggunakan kedua file PDF yang telah diberikan.
+
+Query pengguna: {query}
+
+=== INSTRUKSI ANALISIS ===
+1. Baca dan analisis kedua file PDF KUHP (lama dan baru) yang telah diberikan
+2. Temukan pasal-pasal yang relevan dengan query pengguna dari KEDUA versi KUHP
+3. Bandingkan ketentuan yang relevan secara detail
+4. Jelaskan perbedaan utama yang ditemukan
+5. Gunakan bahasa Indonesia yang jelas dan mudah dipahami
+
+=== FORMAT RESPONS (WAJIB JSON) ===
+Berikan respons dalam format JSON yang valid seperti berikut:
+
+```json
+{{
+  "ringkasan": "Ringkasan singkat perbedaan utama dalam 2-3 kalimat",
+  "pasal_terkait": [
+    {{
+      "topik": "Nama topik/judul pasal (contoh: Penganiayaan, Pencurian, dll)",
+      "kuhp_lama": {{
+        "pasal": "Nomor pasal di KUHP lama (contoh: Pasal 351)",
+        "judul": "Judul pasal",
+        "isi": "Isi lengkap pasal dari KUHP lama, kutip secara verbatim",
+        "sanksi": "Sanksi/hukuman yang tercantum"
+      }},
+      "kuhp_baru": {{
+        "pasal": "Nomor pasal di KUHP baru (contoh: Pasal 466)",
+        "judul": "Judul pasal",
+        "isi": "Isi lengkap pasal dari KUHP baru, kutip secara verbatim",
+        "sanksi": "Sanksi/hukuman yang tercantum"
+      }},
+      "perbedaan": ["Perbedaan 1", "Perbedaan 2", "dst"]
+    }}
+  ],
+  "analisis_perubahan": "Analisis mendalam tentang perubahan dan dampaknya",
+  "kesimpulan": "Kesimpulan dan rekomendasi"
+}}
+```
+
+PENTING:
+- Respons HARUS berupa JSON valid tanpa markdown code block
+- Jika pasal tidak ada di salah satu versi, isi dengan null
+- Kutip isi pasal secara verbatim dari dokumen PDF
+- Bisa ada lebih dari satu pasal_terkait jika query menyangkut beberapa pasal"""
+
+_CHAT_PROMPT_TEMPLATE = """Anda adalah AI assistant yang ahli dalam hukum pidana Indonesia, khususnya KUHP (Kitab Undang-Undang Hukum Pidana).
+
+Anda memiliki akses ke dua dokumen PDF:
+1. KUHP Lama (sebelum revisi)
+2. KUHP Baru (hasil revisi, UU No. 1 Tahun 2023)
+
+Pertanyaan pengguna: {message}
+
+=== INSTRUKSI ===
+1. Jawab pertanyaan pengguna dengan bahasa yang natural dan mudah dipahami
+2. Gunakan informasi dari kedua dokumen KUHP jika relevan
+3. Jika ditanya tentang pasal tertentu, kutip isi pasal yang relevan
+4. Jika ditanya perbandingan, jelaskan perbedaan dengan jelas
+5. Berikan konteks dan penjelasan yang membantu pemahaman
+6. Gunakan format yang rapi dengan bullet points atau numbering jika perlu
+7. Jangan gunakan format JSON, berikan jawaban dalam bentuk teks natural
+
+=== FORMAT JAWABAN ===
+Berikan jawaban dalam bentuk paragraf atau bullet points yang mudah dibaca.
+Gunakan **bold** untuk menekankan poin penting.
+Kutip pasal dengan jelas jika relevan.
 
-@dataclass
+Jawab dalam bahasa Indonesia yang profesional namun mudah dipahami."""
+
+
+@dataclass(slots=True, frozen=True)
 class KUHPConfig:
     """Konfigurasi untuk KUHP analyzer"""
     model_name: str = "gemini-2.5-flash"  # Stable model for file API
     temperature: float = 0.1
     old_kuhp_path: str = "documents/kuhp_old.pdf"
     new_kuhp_path: str = "documents/kuhp_new.pdf"
+    upload_cache_path: str = "documents/.upload_cache.json"
 
 
 class KUHPAnalyzer:
@@ -34,10 +165,16 @@ class KUHPAnalyzer:
     
     def __init__(self):
         self.config = KUHPConfig()
-        self.model = None
+        self._model = None
         self.old_kuhp_file = None
         self.new_kuhp_file = None
+        self._files: Optional[tuple] = None  # (KUHP lama, KUHP baru), diisi setelah upload
         self.is_initialized = False
+        self._files_verified_at: float = 0.0
+        self._verify_ttl = 300  # seconds
+        self._resp_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._resp_cache_max = 256
+        self._resp_cache_ttl = 3600  # seconds
         
         # Initialize Gemini
         self._initialize_gemini()
@@ -54,85 +191,180 @@ class KUHPAnalyzer:
                 
             genai.configure(api_key=api_key)
             
-            self.model = genai.GenerativeModel(
+            log.info("Gemini initialized successfully using %s", self.config.model_name)
+            
+        except Exception as e:
+            log.error("Failed to initialize Gemini: %s", e)
+            raise
+            
+    @property
+    def model(self):
+        """GenerativeModel dibuat saat pertama kali dipakai untuk generate"""
+        if self._model is None:
+            self._model = genai.GenerativeModel(
                 model_name=self.config.model_name,
                 generation_config={
                     "temperature": self.config.temperature
                     # No max_output_tokens limit - use model default
                 }
             )
-            
-            print(f"[KUHP] Gemini initialized successfully using {self.config.model_name}")
-            
-        except Exception as e:
-            print(f"[KUHP ERROR] Failed to initialize Gemini: {e}")
-            raise
-            
-    def load_documents(self) -> bool:
+        return self._model
+
+    async def load_documents(self) -> bool:
         """Load PDF files ke Gemini menggunakan File API"""
         try:
-            print("[KUHP] Uploading PDF documents to Gemini...")
-            
-            # Upload KUHP lama
+            log.info("Uploading PDF documents to Gemini...")
+
             old_path = Path(self.config.old_kuhp_path)
-            if old_path.exists():
-                print(f"[KUHP] Uploading {old_path.name}...")
-                self.old_kuhp_file = genai.upload_file(
-                    path=str(old_path),
-                    display_name="KUHP Lama"
-                )
-                print(f"[KUHP] KUHP Lama uploaded: {self.old_kuhp_file.display_name}")
-            else:
-                print(f"[KUHP WARNING] File not found: {old_path}")
-                return False
-            
-            # Upload KUHP baru
             new_path = Path(self.config.new_kuhp_path)
-            if new_path.exists():
-                print(f"[KUHP] Uploading {new_path.name}...")
-                self.new_kuhp_file = genai.upload_file(
-                    path=str(new_path),
-                    display_name="KUHP Baru"
-                )
-                print(f"[KUHP] KUHP Baru uploaded: {self.new_kuhp_file.display_name}")
-            else:
-                print(f"[KUHP WARNING] File not found: {new_path}")
-                return False
-                
+
+            for path in (old_path, new_path):
+                if not path.exists():
+                    log.warning("File not found: %s", path)
+                    return False
+
+            # Reuse file yang sudah di-upload sebelumnya jika PDF tidak berubah
+            if await asyncio.to_thread(self._load_cached_handles):
+                self.is_initialized = True
+                log.info("Reusing cached file handles, skipping upload")
+                return True
+
+            # Upload KUHP lama dan baru secara paralel
+            self.old_kuhp_file, self.new_kuhp_file = await asyncio.gather(
+                asyncio.to_thread(self._upload_one, old_path, "KUHP Lama"),
+                asyncio.to_thread(self._upload_one, new_path, "KUHP Baru")
+            )
+            self._files = (self.old_kuhp_file, self.new_kuhp_file)
+            self._files_verified_at = 0.0
+
             # Wait for files to be processed
-            self._wait_for_files_active()
-            
+            await self._wait_for_files_active()
+
+            await asyncio.to_thread(self._save_cached_handles)
+
+            # Dokumen baru berarti hasil analisis lama tidak berlaku lagi
+            self._resp_cache.clear()
+
             self.is_initialized = True
-            print("[KUHP] Documents loaded and ready for analysis")
-            
+            log.info("Documents loaded and ready for analysis")
+
             return True
-            
+
         except Exception as e:
-            print(f"[KUHP ERROR] Failed to load documents: {e}")
+            log.error("Failed to load documents: %s", e)
             return False
-            
-    def _wait_for_files_active(self):
+
+    def _upload_one(self, path: Path, display_name: str):
+        """Upload satu file PDF ke Gemini File API"""
+        log.info("Uploading %s...", path.name)
+        uploaded = genai.upload_file(path=str(path), display_name=display_name)
+        log.info("%s uploaded: %s", display_name, uploaded.display_name)
+        return uploaded
+
+    def _file_sha256(self, path: Path) -> str:
+        """Hitung sha256 dari isi file PDF"""
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+
+    def _load_cached_handles(self) -> bool:
+        """Load file handle dari upload cache jika PDF tidak berubah dan file masih ACTIVE"""
+        cache_path = Path(self.config.upload_cache_path)
+        if not cache_path.exists():
+            return False
+
+        try:
+            cache = json.loads(cache_path.read_text())
+            handles = []
+            digests = {}
+            stale_stat = False
+
+            for path in (Path(self.config.old_kuhp_path), Path(self.config.new_kuhp_path)):
+                entry = cache.get(str(path))
+                if not entry:
+                    return False
+
+                # Cek cepat size/mtime dulu, hash isi file hanya jika berbeda
+                st = path.stat()
+                if st.st_size != entry.get("size") or st.st_mtime_ns != entry.get("mtime_ns"):
+                    if entry.get("sha256") != self._file_sha256(path):
+                        return False
+                    stale_stat = True
+
+                # Di kedua jalur, sha256 di cache sudah terbukti sama dengan isi file
+                digests[str(path)] = entry["sha256"]
+
+                file_info = genai.get_file(entry["file_name"])
+                if file_info.state.name != "ACTIVE":
+                    return False
+                handles.append(file_info)
+
+        except Exception as e:
+            log.warning("Upload cache unusable, re-uploading: %s", e)
+            return False
+
+        self.old_kuhp_file, self.new_kuhp_file = handles
+        self._files = tuple(handles)
+        self._files_verified_at = 0.0
+
+        # Isi sama tapi mtime berubah: perbarui cache agar startup berikutnya lewat jalur cepat
+        if stale_stat:
+            self._save_cached_handles(digests)
+        return True
+
+    def _save_cached_handles(self, digests: Optional[Dict[str, str]] = None):
+        """Simpan file handle ke upload cache secara atomik
+
+        digests berisi sha256 yang sudah diketahui per path agar PDF tidak di-hash ulang.
+        """
+        digests = digests or {}
+        cache_path = Path(self.config.upload_cache_path)
+        try:
+            cache = {}
+            for path, uploaded in (
+                (Path(self.config.old_kuhp_path), self.old_kuhp_file),
+                (Path(self.config.new_kuhp_path), self.new_kuhp_file)
+            ):
+                st = path.stat()
+                cache[str(path)] = {
+                    "path": str(path),
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "sha256": digests.get(str(path)) or self._file_sha256(path),
+                    "file_name": uploaded.name
+                }
+
+            tmp_path = cache_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(cache, indent=2))
+            os.replace(tmp_path, cache_path)
+
+        except Exception as e:
+            log.warning("Failed to write upload cache: %s", e)
+
+    async def _wait_for_files_active(self):
         """Wait for uploaded files to become active"""
-        print("[KUHP] Waiting for files to be processed...")
-        
+        log.info("Waiting for files to be processed...")
+
         max_wait_time = 60  # seconds
-        wait_interval = 2
-        elapsed = 0
-        
+        interval = 0.2  # mulai pendek, naik eksponensial sampai 2 detik
+        elapsed = 0.0
+
         while elapsed < max_wait_time:
-            old_file_info = genai.get_file(self.old_kuhp_file.name) if self.old_kuhp_file else None
-            new_file_info = genai.get_file(self.new_kuhp_file.name) if self.new_kuhp_file else None
-            
-            if (old_file_info and old_file_info.state.name == "ACTIVE" and
-                new_file_info and new_file_info.state.name == "ACTIVE"):
-                print("[KUHP] Both files are now active and ready for use")
+            # Probe kedua file secara bersamaan
+            loop = asyncio.get_running_loop()
+            infos = await asyncio.gather(
+                *(loop.run_in_executor(_PROBE_POOL, genai.get_file, f.name) for f in self._files)
+            )
+
+            if all(info.state.name == "ACTIVE" for info in infos):
+                self._files_verified_at = time.monotonic()
+                log.info("Both files are now active and ready for use")
                 return
-                
-            print(f"[KUHP] Files still processing... ({elapsed}s elapsed)")
-            time.sleep(wait_interval)
-            elapsed += wait_interval
-            
-        print("[KUHP WARNING] Files may not be fully processed, but continuing anyway")
+
+            log.info("Files still processing... (%.1fs elapsed)", elapsed)
+            await asyncio.sleep(interval)
+            elapsed += interval
+            interval = min(interval * 2, 2.0)
+
+        log.warning("Files may not be fully processed, but continuing anyway")
 
     def analyze_differences(self, query: str) -> Dict[str, Any]:
         """Analyze perbedaan KUHP berdasarkan query langsung dari PDF files"""
@@ -143,18 +375,26 @@ class KUHPAnalyzer:
             if not self.old_kuhp_file or not self.new_kuhp_file:
                 raise Exception("PDF files belum di-upload")
 
-            print(f"[KUHP] Starting analysis for query: {query[:100]}...")
+            cache_key = self._response_cache_key(query)
+            cached = self._get_cached_response(cache_key)
+            if cached is not None:
+                log.info("Cache hit for query: %s", query[:100])
+                return cached
+
+            log.info("Starting analysis for query: %s...", query[:100])
 
             # Check relevance first
             is_relevant = self._check_query_relevance(query)
 
             if not is_relevant:
-                return {
+                result = {
                     "response": self._get_irrelevant_response(),
                     "is_relevant": False,
                     "comparison_data": None,
                     "files_used": 0
                 }
+                self._store_cached_response(cache_key, result)
+                return result
 
             # Generate analysis dengan PDF files
             analysis_prompt = self._build_analysis_prompt(query)
@@ -172,13 +412,77 @@ class KUHPAnalyzer:
                 "files_used": 2  # both PDF files
             }
 
-            print("[KUHP] Analysis completed using both KUHP PDF files")
+            # Jangan cache respons yang gagal di-parse agar bisa dicoba lagi
+            if comparison_data is not None:
+                self._store_cached_response(cache_key, result)
+
+            log.info("Analysis completed using both KUHP PDF files")
             return result
 
         except Exception as e:
-            print(f"[KUHP ERROR] Analysis failed: {e}")
+            log.error("Analysis failed: %s", e)
             raise
 
+    def analyze_differences_stream(self, query: str) -> Iterator[str]:
+        """Analyze perbedaan KUHP dengan streaming potongan teks dari Gemini"""
+        if not self.is_initialized:
+            raise Exception("Gemini belum diinisialisasi")
+
+        if not self.old_kuhp_file or not self.new_kuhp_file:
+            raise Exception("PDF files belum di-upload")
+
+        log.info("Starting streaming analysis for query: %s...", query[:100])
+
+        if not self._check_query_relevance(query):
+            yield self._get_irrelevant_response()
+            return
+
+        self._verify_files_ready()
+
+        content = [
+            self.old_kuhp_file,
+            self.new_kuhp_file,
+            self._build_analysis_prompt(query)
+        ]
+
+        try:
+            response = self.model.generate_content(content, stream=True)
+            for chunk in response:
+                if chunk.parts:
+                    yield chunk.text
+        except Exception:
+            # Paksa verifikasi ulang file pada request berikutnya
+            self._files_verified_at = 0.0
+            raise
+
+        log.info("Streaming analysis completed")
+
+    def _response_cache_key(self, query: str) -> str:
+        """Normalize query (lowercase, whitespace) menjadi cache key"""
+        normalized = " ".join(query.lower().split())
+        return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+
+    def _get_cached_response(self, key: str) -> Optional[Dict[str, Any]]:
+        """Ambil hasil analisis dari LRU cache jika belum kedaluwarsa"""
+        entry = self._resp_cache.get(key)
+        if entry is None:
+            return None
+
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self._resp_cache_ttl:
+            self._resp_cache.pop(key, None)
+            return None
+
+        self._resp_cache.move_to_end(key)
+        return result
+
+    def _store_cached_response(self, key: str, result: Dict[str, Any]):
+        """Simpan hasil analisis ke LRU cache"""
+        self._resp_cache[key] = (time.monotonic(), result)
+        self._resp_cache.move_to_end(key)
+        while len(self._resp_cache) > self._resp_cache_max:
+            self._resp_cache.popitem(last=False)
+
     def _parse_json_response(self, response_text: str) -> Optional[Dict[str, Any]]:
         """Parse JSON dari response Gemini"""
         try:
@@ -203,98 +507,35 @@ class KUHPAnalyzer:
                 except json.JSONDecodeError:
                     continue
 
-        print("[KUHP WARNING] Could not parse JSON from response, returning None")
+        log.warning("Could not parse JSON from response, returning None")
         return None
 
     def _check_query_relevance(self, query: str) -> bool:
         """Check apakah query relevan dengan KUHP"""
-        kuhp_keywords = [
-            'kuhp', 'hukum pidana', 'pasal', 'pidana', 'kejahatan', 'pelanggaran',
-            'pencurian', 'pembunuhan', 'penganiayaan', 'penipuan', 'korupsi',
-            'perkosaan', 'narkoba', 'terorisme', 'cyber', 'cyber crime',
-            'sanksi', 'hukuman', 'denda', 'penjara', 'kurungan', 'tahanan',
-            'tindak pidana', 'delik', 'unsur', 'ancaman', 'maksimal', 'minimal'
-        ]
-        
         query_lower = query.lower()
-        return any(keyword in query_lower for keyword in kuhp_keywords)
-    
-    def _get_irrelevant_response(self) -> str:
-        """Response untuk query yang tidak relevan"""
-        return """Maaf, pertanyaan Anda sepertinya tidak terkait dengan KUHP (Kitab Undang-Undang Hukum Pidana) Indonesia.
+        if not _KW_SINGLE.isdisjoint(query_lower.split()):
+            return True
 
-Saya adalah AI assistant yang khusus dirancang untuk menganalisis perbedaan antara KUHP lama dan KUHP baru yang berlaku di Indonesia.
+        # Keyword multi-kata dan kemunculan di dalam kata lain
+        if AHOCORASICK_AVAILABLE:
+            return any(True for _ in _KUHP_AUTOMATON.iter(query_lower))
+        return _KUHP_PATTERN.search(query_lower) is not None
 
-Silakan tanyakan hal-hal yang berkaitan dengan:
-• Pasal-pasal dalam KUHP
-• Jenis-jenis tindak pidana (kejahatan dan pelanggaran)
-• Sanksi dan hukuman dalam KUHP
-• Perbedaan ketentuan antara KUHP lama dan baru
-• Perubahan sistem pemidanaan
-
-Contoh pertanyaan yang dapat saya bantu:
-- "Apa perbedaan Pasal 351 tentang penganiayaan di KUHP lama dan baru?"
-- "Bagaimana perubahan ketentuan tentang pencurian?"
-- "Apa sanksi untuk tindak pidana korupsi di KUHP baru?"
-"""
+    def _get_irrelevant_response(self) -> str:
+        """Response untuk query yang tidak relevan"""
+        return _IRRELEVANT_RESPONSE
 
     def _build_analysis_prompt(self, query: str) -> str:
         """Build analysis prompt untuk Gemini dengan PDF files - output JSON terstruktur"""
-
-        prompt = f"""Anda adalah AI assistant yang ahli dalam menganalisis KUHP (Kitab Undang-Undang Hukum Pidana) Indonesia.
-
-Tugas Anda: Analisis perbedaan antara KUHP lama dan KUHP baru berdasarkan query pengguna dengan menggunakan kedua file PDF yang telah diberikan.
-
-Query pengguna: {query}
-
-=== INSTRUKSI ANALISIS ===
-1. Baca dan analisis kedua file PDF KUHP (lama dan baru) yang telah diberikan
-2. Temukan pasal-pasal yang relevan dengan query pengguna dari KEDUA versi KUHP
-3. Bandingkan ketentuan yang relevan secara detail
-4. Jelaskan perbedaan utama yang ditemukan
-5. Gunakan bahasa Indonesia yang jelas dan mudah dipahami
-
-=== FORMAT RESPONS (WAJIB JSON) ===
-Berikan respons dalam format JSON yang valid seperti berikut:
-
-```json
-{{
-  "ringkasan": "Ringkasan singkat perbedaan utama dalam 2-3 kalimat",
-  "pasal_terkait": [
-    {{
-      "topik": "Nama topik/judul pasal (contoh: Penganiayaan, Pencurian, dll)",
-      "kuhp_lama": {{
-        "pasal": "Nomor pasal di KUHP lama (contoh: Pasal 351)",
-        "judul": "Judul pasal",
-        "isi": "Isi lengkap pasal dari KUHP lama, kutip secara verbatim",
-        "sanksi": "Sanksi/hukuman yang tercantum"
-      }},
-      "kuhp_baru": {{
-        "pasal": "Nomor pasal di KUHP baru (contoh: Pasal 466)",
-        "judul": "Judul pasal",
-        "isi": "Isi lengkap pasal dari KUHP baru, kutip secara verbatim",
-        "sanksi": "Sanksi/hukuman yang tercantum"
-      }},
-      "perbedaan": ["Perbedaan 1", "Perbedaan 2", "dst"]
-    }}
-  ],
-  "analisis_perubahan": "Analisis mendalam tentang perubahan dan dampaknya",
-  "kesimpulan": "Kesimpulan dan rekomendasi"
-}}
-```
-
-PENTING:
-- Respons HARUS berupa JSON valid tanpa markdown code block
-- Jika pasal tidak ada di salah satu versi, isi dengan null
-- Kutip isi pasal secara verbatim dari dokumen PDF
-- Bisa ada lebih dari satu pasal_terkait jika query menyangkut beberapa pasal"""
-
-        return prompt
+        return _ANALYSIS_PROMPT_TEMPLATE.format(query=query)
 
     def _generate_response_with_files(self, prompt: str) -> str:
         """Generate response menggunakan Gemini dengan PDF files"""
         max_retries = 3
         retry_delay = 2
+        max_delay = 8
+        budget = 4.0  # total detik maksimal untuk sleep antar retry (worst case tanpa budget: 6s)
+        total_slept = 0.0
 
         for attempt in range(max_retries):
             try:
@@ -309,7 +550,7 @@ PENTING:
                     prompt               # Prompt terakhir
                 ]
 
-                print(f"[KUHP] Generating response (attempt {attempt + 1}/{max_retries})...")
+                log.info("Generating response (attempt %s/%s)...", attempt + 1, max_retries)
                 response = self.model.generate_content(content)
 
                 if response.text:
@@ -318,30 +559,40 @@ PENTING:
                     raise Exception("Empty response received from Gemini")
 
             except Exception as e:
-                print(f"[KUHP ERROR] Response generation failed (attempt {attempt + 1}): {e}")
-                if attempt < max_retries - 1:
-                    print(f"[KUHP] Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                else:
+                log.error("Response generation failed (attempt %s): %s", attempt + 1, e)
+                # Paksa verifikasi ulang file pada attempt berikutnya
+                self._files_verified_at = 0.0
+                if attempt >= max_retries - 1:
+                    raise
+
+                # Exponential backoff dengan full jitter agar retry tidak serentak
+                sleep_s = random.uniform(0, min(retry_delay, max_delay))
+                if total_slept + sleep_s > budget:
                     raise
 
+                log.info("Retrying in %.1f seconds...", sleep_s)
+                time.sleep(sleep_s)
+                total_slept += sleep_s
+                retry_delay = min(retry_delay * 2, max_delay)
+
     def _verify_files_ready(self):
         """Verify both files are still active and ready"""
+        if time.monotonic() - self._files_verified_at < self._verify_ttl:
+            return
+
         try:
-            old_file_info = genai.get_file(self.old_kuhp_file.name)
-            new_file_info = genai.get_file(self.new_kuhp_file.name)
+            futures = [_PROBE_POOL.submit(genai.get_file, f.name) for f in self._files]
+            infos = [future.result() for future in futures]
 
-            if old_file_info.state.name != "ACTIVE":
-                print(f"[KUHP WARNING] Old KUHP file state: {old_file_info.state.name}")
-                raise Exception(f"KUHP Lama file is not active: {old_file_info.state.name}")
+            for info in infos:
+                if info.state.name != "ACTIVE":
+                    log.warning("%s file state: %s", info.display_name, info.state.name)
+                    raise Exception(f"{info.display_name} file is not active: {info.state.name}")
 
-            if new_file_info.state.name != "ACTIVE":
-                print(f"[KUHP WARNING] New KUHP file state: {new_file_info.state.name}")
-                raise Exception(f"KUHP Baru file is not active: {new_file_info.state.name}")
+            self._files_verified_at = time.monotonic()
 
         except Exception as e:
-            print(f"[KUHP ERROR] File verification failed: {e}")
+            log.error("File verification failed: %s", e)
             raise
 
     def chat(self, message: str) -> Dict[str, Any]:
@@ -353,7 +604,7 @@ PENTING:
             if not self.old_kuhp_file or not self.new_kuhp_file:
                 raise Exception("PDF files belum di-upload")
 
-            print(f"[KUHP CHAT] Processing message: {message[:100]}...")
+            log.info("Chat processing message: %s...", message[:100])
 
             # Check relevance
             is_relevant = self._check_query_relevance(message)
@@ -370,44 +621,19 @@ PENTING:
             # Generate response
             response_text = self._generate_response_with_files(chat_prompt)
 
-            print("[KUHP CHAT] Response generated successfully")
+            log.info("Chat response generated successfully")
             return {
                 "response": response_text,
                 "is_relevant": True
             }
 
         except Exception as e:
-            print(f"[KUHP CHAT ERROR] Chat failed: {e}")
+            log.error("Chat failed: %s", e)
             raise
 
     def _build_chat_prompt(self, message: str) -> str:
         """Build chat prompt untuk percakapan natural tentang KUHP"""
-
-        prompt = f"""Anda adalah AI assistant yang ahli dalam hukum pidana Indonesia, khususnya KUHP (Kitab Undang-Undang Hukum Pidana).
-
-Anda memiliki akses ke dua dokumen PDF:
-1. KUHP Lama (sebelum revisi)
-2. KUHP Baru (hasil revisi, UU No. 1 Tahun 2023)
-
-Pertanyaan pengguna: {message}
-
-=== INSTRUKSI ===
-1. Jawab pertanyaan pengguna dengan bahasa yang natural dan mudah dipahami
-2. Gunakan informasi dari kedua dokumen KUHP jika relevan
-3. Jika ditanya tentang pasal tertentu, kutip isi pasal yang relevan
-4. Jika ditanya perbandingan, jelaskan perbedaan dengan jelas
-5. Berikan konteks dan penjelasan yang membantu pemahaman
-6. Gunakan format yang rapi dengan bullet points atau numbering jika perlu
-7. Jangan gunakan format JSON, berikan jawaban dalam bentuk teks natural
-
-=== FORMAT JAWABAN ===
-Berikan jawaban dalam bentuk paragraf atau bullet points yang mudah dibaca.
-Gunakan **bold** untuk menekankan poin penting.
-Kutip pasal dengan jelas jika relevan.
-
-Jawab dalam bahasa Indonesia yang profesional namun mudah dipahami."""
-
-        return prompt
+        return _CHAT_PROMPT_TEMPLATE.format(message=message)
 
     def get_status(self) -> Dict[str, Any]:
         """Get analyzer status"""
@@ -420,6 +646,18 @@ Jawab dalam bahasa Indonesia yang profesional namun mudah dipahami."""
         }
 
 
+_INSTANCE: Optional[KUHPAnalyzer] = None
+
+
 def get_analyzer_instance() -> KUHPAnalyzer:
-    """Get KUHP Analyzer instance untuk aplikasi"""
-    return KUHPAnalyzer()
\ No newline at end of file
+    """Get KUHP Analyzer instance untuk aplikasi (singleton per proses)"""
+    global _INSTANCE
+    if _INSTANCE is None:
+        _INSTANCE = KUHPAnalyzer()
+    return _INSTANCE
+
+
+def _reset_instance():
+    """Reset singleton analyzer, untuk keperluan testing"""
+    global _INSTANCE
+    _INSTANCE = None
@@ -1,7 +1,11 @@
 import os
-from typing import Optional, List, Any
+import json
+import logging
+import asyncio
+from typing import Optional, List
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import uvicorn
@@ -11,10 +15,14 @@ from kuhp_agent import get_analyzer_instance, KUHPAnalyzer
 
 load_dotenv()
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+log = logging.getLogger("kuhp.api")
+
 app = FastAPI(
     title="KUHP Analyzer - Gemini File API",
     version="3.1.0",
-    description="AI Analyzer untuk analisis perbedaan KUHP lama dan baru dengan tampilan side-by-side"
+    description="AI Analyzer untuk analisis perbedaan KUHP lama dan baru dengan tampilan side-by-side",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -67,26 +75,37 @@ class ChatResponse(BaseModel):
 
 # Global analyzer instance
 kuhp_analyzer: Optional[KUHPAnalyzer] = None
+app.state.ready = False
+_warmup_task: Optional[asyncio.Task] = None
+
+async def _warmup(analyzer: KUHPAnalyzer):
+    """Upload PDF documents di background agar startup tidak terblokir"""
+    try:
+        if await analyzer.load_documents():
+            app.state.ready = True
+            log.info("KUHP Analyzer initialized successfully")
+        else:
+            log.warning("Failed to load documents, analyzer may have limited functionality")
+    except Exception as e:
+        log.error("Document warmup failed: %s", e)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize KUHP Analyzer dengan Gemini File API"""
-    global kuhp_analyzer
+    global kuhp_analyzer, _warmup_task
     
     try:
-        print("[KUHP] Initializing KUHP Analyzer with Gemini File API")
+        log.info("Initializing KUHP Analyzer with Gemini File API")
         
         # Initialize analyzer
         kuhp_analyzer = get_analyzer_instance()
         
-        # Load documents
-        if kuhp_analyzer.load_documents():
-            print("[KUHP] KUHP Analyzer initialized successfully")
-        else:
-            print("[KUHP WARNING] Failed to load documents, analyzer may have limited functionality")
+        # Load documents di background, /health langsung dapat merespons
+        app.state.ready = False
+        _warmup_task = asyncio.create_task(_warmup(kuhp_analyzer))
             
     except Exception as e:
-        print(f"[KUHP ERROR] Failed to initialize analyzer: {e}")
+        log.error("Failed to initialize analyzer: %s", e)
         # Don't raise - let the app start but handle errors in endpoints
         kuhp_analyzer = None
 
@@ -111,6 +130,12 @@ async def analyze_kuhp_difference(request: QueryRequest):
                 status_code=503, 
                 detail="KUHP Analyzer belum diinisialisasi. Silakan coba lagi nanti."
             )
+
+        if not app.state.ready:
+            raise HTTPException(
+                status_code=503,
+                detail="Dokumen KUHP masih dimuat. Silakan coba lagi nanti."
+            )
             
         # Validate input
         if not request.query or not request.query.strip():
@@ -122,7 +147,7 @@ async def analyze_kuhp_difference(request: QueryRequest):
         query = request.query.strip()
         
         # Analyze menggunakan Gemini File API
-        print(f"[KUHP] Processing query: {query}")
+        log.info("Processing query: %s", query)
         analysis_result = kuhp_analyzer.analyze_differences(query)
         
         # Parse comparison_data jika ada
@@ -131,7 +156,7 @@ async def analyze_kuhp_difference(request: QueryRequest):
             try:
                 comparison_data = ComparisonData(**analysis_result["comparison_data"])
             except Exception as e:
-                print(f"[KUHP WARNING] Failed to parse comparison_data: {e}")
+                log.warning("Failed to parse comparison_data: %s", e)
 
         return QueryResponse(
             response=analysis_result["response"],
@@ -147,12 +172,50 @@ async def analyze_kuhp_difference(request: QueryRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[KUHP ERROR] Analysis failed: {e}")
+        log.error("Analysis failed: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Terjadi kesalahan saat memproses analisis: {str(e)}"
         )
 
+@app.post("/analyze/stream")
+async def analyze_kuhp_difference_stream(request: QueryRequest):
+    """
+    Analyze perbedaan KUHP dengan streaming response (Server-Sent Events)
+    """
+    if not kuhp_analyzer:
+        raise HTTPException(
+            status_code=503,
+            detail="KUHP Analyzer belum diinisialisasi. Silakan coba lagi nanti."
+        )
+
+    if not app.state.ready:
+        raise HTTPException(
+            status_code=503,
+            detail="Dokumen KUHP masih dimuat. Silakan coba lagi nanti."
+        )
+
+    # Validate input
+    if not request.query or not request.query.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Query tidak boleh kosong"
+        )
+
+    query = request.query.strip()
+    log.info("Processing streaming query: %s", query)
+
+    def event_stream():
+        try:
+            for text in kuhp_analyzer.analyze_differences_stream(query):
+                yield f"data: {json.dumps({'text': text})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            log.error("Streaming analysis failed: %s", e)
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_kuhp(request: ChatRequest):
     """
@@ -165,6 +228,12 @@ async def chat_kuhp(request: ChatRequest):
                 detail="KUHP Analyzer belum diinisialisasi. Silakan coba lagi nanti."
             )
 
+        if not app.state.ready:
+            raise HTTPException(
+                status_code=503,
+                detail="Dokumen KUHP masih dimuat. Silakan coba lagi nanti."
+            )
+
         # Validate input
         if not request.message or not request.message.strip():
             raise HTTPException(
@@ -175,7 +244,7 @@ async def chat_kuhp(request: ChatRequest):
         message = request.message.strip()
 
         # Chat menggunakan Gemini
-        print(f"[KUHP CHAT] Processing message: {message}")
+        log.info("Chat processing message: %s", message)
         chat_result = kuhp_analyzer.chat(message)
 
         return ChatResponse(
@@ -186,7 +255,7 @@ async def chat_kuhp(request: ChatRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[KUHP CHAT ERROR] Chat failed: {e}")
+        log.error("Chat failed: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Terjadi kesalahan saat memproses chat: {str(e)}"
@@ -212,7 +281,7 @@ async def get_analyzer_status():
         )
         
     except Exception as e:
-        print(f"[KUHP ERROR] Status check failed: {e}")
+        log.error("Status check failed: %s", e)
         return AnalyzerStatusResponse(
             status="error",
             analyzer_info={"error": str(e)},
@@ -229,7 +298,8 @@ async def reload_analyzer_files():
                 detail="Analyzer tidak tersedia"
             )
             
-        if kuhp_analyzer.load_documents():
+        if await kuhp_analyzer.load_documents():
+            app.state.ready = True
             return {
                 "message": "PDF files berhasil direload",
                 "status": "success"
@@ -243,7 +313,7 @@ async def reload_analyzer_files():
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[KUHP ERROR] File reload failed: {e}")
+        log.error("File reload failed: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Gagal reload files: {str(e)}"
@@ -256,6 +326,8 @@ async def health_check():
         "status": "healthy",
         "service": "kuhp-analyzer-gemini",
         "version": "3.0.0",
+        "agent_loaded": kuhp_analyzer is not None,
+        "ready": app.state.ready,
         "components": {
             "fastapi": "healthy",
             "analyzer": "unknown",
@@ -308,4 +380,9 @@ async def get_analyzer_documentation():
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8080))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        workers=int(os.getenv("WORKERS", "1"))
+    )
\ No newline at end of file